@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Point-in-time training dataset builder.
+
+Replays `case_audit` and `case_activity` history and emits one row per
+scoring snapshot (every CASE_SCORED audit event), plus the 30-day recovery
+label. Each row holds the case fields and activity stats as they were at
+that moment, the same inputs score_case reads, run through the model's
+feature spec (features.py). Nothing that happened after the snapshot is used
+to build its features, so there is no look-ahead leakage.
+
+Both inputs are JSON-lines exports ordered by (case_id, created_at), which
+the existing (case_id, created_at) indexes serve without a sort:
+
+    COPY (SELECT row_to_json(a) FROM case_audit a ORDER BY case_id, created_at)
+      TO 'case_audit.jsonl';
+    COPY (SELECT row_to_json(a) FROM case_activity a ORDER BY case_id, created_at)
+      TO 'case_activity.jsonl';
+
+The two streams are sort-merge joined on case_id in a single linear pass.
+Chunks of whole cases are featurised in parallel worker processes and the
+result is written as memory-mappable .npy arrays, which
+`train_demo_model.py --dataset DIR` loads with mmap_mode='r':
+
+    DIR/X.npy            float64 (n_rows, n_columns)       dense specs
+    DIR/X_data.npy       float64 (nnz,)                    sparse specs (CSR)
+    DIR/X_indices.npy    int64   (nnz,)
+    DIR/X_indptr.npy     int64   (n_rows + 1,)
+    DIR/y.npy            int8    (n_rows,)
+    DIR/snapshot_ts.npy  float64 (n_rows,)   snapshot time (unix seconds)
+    DIR/meta.json        feature spec, columns, row count, as-of cutoff
+
+Usage:
+    python build_dataset.py --audit case_audit.jsonl --activity case_activity.jsonl --out dataset/
+    python build_dataset.py ... --spec model.json   # use that model's feature spec
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import math
+import os
+import sys
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from multiprocessing import Pool
+
+import numpy as np
+
+from features import compile_features, load_feature_spec
+from instrumentation import timer, count
+from online_update import CLOSED_STATUSES, RECOVERY_WINDOW_DAYS, parse_timestamp
+
+ATTEMPT_WINDOW_DAYS = 30
+NO_ACTIVITY_DAYS = 999  # score_case's value when a case has no activity
+
+
+def iter_jsonl(path):
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_cases(audit_rows, activity_rows):
+    """
+    Sort-merge join of two case_id-ordered streams.
+    Yields (case_id, audit_rows, activity_rows) for every case with audit history.
+    """
+    audit_groups = itertools.groupby(audit_rows, key=lambda r: r['case_id'])
+    activity_groups = itertools.groupby(activity_rows, key=lambda r: r['case_id'])
+
+    def next_activity():
+        nonlocal last_act_id
+        act_id, act_group = next(activity_groups, (None, None))
+        if act_id is not None:
+            if last_act_id is not None and act_id < last_act_id:
+                raise ValueError(
+                    f"case_activity export is not ordered by case_id ({last_act_id} > {act_id})"
+                )
+            last_act_id = act_id
+        return act_id, act_group
+
+    last_act_id = None
+    act_id, act_group = next_activity()
+    last_id = None
+    for case_id, group in audit_groups:
+        if last_id is not None and case_id < last_id:
+            raise ValueError(f"case_audit export is not ordered by case_id ({last_id} > {case_id})")
+        last_id = case_id
+
+        while act_id is not None and act_id < case_id:
+            act_id, act_group = next_activity()
+        activities = list(act_group) if act_id == case_id else []
+        yield case_id, list(group), activities
+
+    # Read the rest so an out-of-order tail is reported rather than ignored
+    while act_id is not None:
+        act_id, act_group = next_activity()
+
+
+def _recovered_at(audit_rows):
+    """First time the case was marked RECOVERED, or None"""
+    for row in audit_rows:
+        after = row.get('after') or {}
+        if after.get('status') == 'RECOVERED' or after.get('closure_reason') == 'RECOVERED':
+            return parse_timestamp(after.get('closed_at') or row['created_at'])
+    return None
+
+
+def _resolved_at(audit_rows):
+    """First time the case was closed or recovered (any closure_reason), or None"""
+    for row in audit_rows:
+        after = row.get('after') or {}
+        if after.get('status') in CLOSED_STATUSES or after.get('closure_reason'):
+            return parse_timestamp(after.get('closed_at') or row['created_at'])
+    return None
+
+
+def featurise_case(audit_rows, activity_rows, as_of):
+    """
+    Replay one case in time order and return a list of (record, label, ts)
+    for each CASE_SCORED snapshot. `record` has the raw fields score_case
+    feeds to the feature spec (case columns plus activity stats).
+
+    Only history up to `as_of` is read, and only snapshots whose 30-day
+    label window has fully elapsed by then are emitted, whatever their
+    outcome; otherwise recent rows would be biased towards early recoveries.
+    """
+    # Nothing recorded after the cutoff may influence features or labels
+    audit = [(ts, r) for ts, r in ((parse_timestamp(r['created_at']), r) for r in audit_rows)
+             if ts <= as_of]
+    activity = [(ts, r) for ts, r in ((parse_timestamp(r['created_at']), r) for r in activity_rows)
+                if ts <= as_of]
+
+    recovered_at = _recovered_at(r for _, r in audit)
+    resolved_at = _resolved_at(r for _, r in audit)
+    if recovered_at is not None and recovered_at > as_of:
+        recovered_at = None
+    window = timedelta(days=RECOVERY_WINDOW_DAYS)
+
+    # Activities sort before audit rows at the same timestamp, matching what
+    # score_case sees when it queries activity at scoring time
+    events = heapq.merge(
+        ((ts, 0, r) for ts, r in activity),
+        ((ts, 1, r) for ts, r in audit),
+        key=lambda e: (e[0], e[1]),
+    )
+
+    state = {'amount': 0.0, 'ageing_days': 0, 'status': 'NEW'}
+    attempts = deque()
+    last_activity = None
+    has_dispute = False
+    has_ptp = False
+    rows = []
+
+    for ts, source, row in events:
+        if source == 0:
+            activity_type = row.get('activity_type')
+            last_activity = ts
+            if activity_type == 'CONTACT_ATTEMPT':
+                attempts.append(ts)
+            elif activity_type == 'DISPUTE_RAISED':
+                has_dispute = True
+            elif activity_type == 'PTP_CREATED':
+                has_ptp = True
+            continue
+
+        after = row.get('after') or {}
+        state.update((k, v) for k, v in after.items() if k != 'features' and v is not None)
+
+        if row.get('action') != 'CASE_SCORED':
+            continue
+
+        # Label is only known once the 30-day window has fully elapsed
+        if ts + window > as_of:
+            continue
+        recovered = recovered_at is not None and ts < recovered_at <= ts + window
+        if resolved_at is not None and resolved_at <= ts:
+            continue  # scored after closure, not a prediction target
+
+        cutoff = ts - timedelta(days=ATTEMPT_WINDOW_DAYS)
+        while attempts and attempts[0] < cutoff:
+            attempts.popleft()
+        days_since_update = (
+            math.floor((ts - last_activity).total_seconds() / 86400)
+            if last_activity is not None else NO_ACTIVITY_DAYS
+        )
+
+        record = dict(state)
+        record.update(
+            attempts_count=len(attempts),
+            days_since_last_update=days_since_update,
+            has_dispute=has_dispute,
+            ptp_active=has_ptp,
+        )
+        rows.append((record, int(recovered), ts.timestamp()))
+
+    return rows
+
+
+def _featurise_chunk(args):
+    cases, as_of, spec = args
+    pipeline = compile_features(spec)
+    records, y, ts = [], [], []
+    for _, audit_rows, activity_rows in cases:
+        for record, label, snapshot_ts in featurise_case(audit_rows, activity_rows, as_of):
+            records.append(record)
+            y.append(label)
+            ts.append(snapshot_ts)
+    return (
+        pipeline.transform(records),
+        np.asarray(y, dtype=np.int8),
+        np.asarray(ts, dtype=np.float64),
+    )
+
+
+def _chunks(cases, chunk_size, as_of, spec):
+    while True:
+        chunk = list(itertools.islice(cases, chunk_size))
+        if not chunk:
+            return
+        yield chunk, as_of, spec
+
+
+def _write_npy(out_dir, layouts, n_rows):
+    """Convert the raw scratch files into .npy arrays and remove them"""
+    for name, (dtype, shape) in layouts.items():
+        bin_path = os.path.join(out_dir, f'{name}.bin')
+        out = np.lib.format.open_memmap(os.path.join(out_dir, f'{name}.npy'),
+                                        mode='w+', dtype=dtype, shape=shape)
+        if shape[0]:
+            out[:] = np.memmap(bin_path, dtype=dtype, mode='r', shape=shape)
+        out.flush()
+        del out
+        os.remove(bin_path)
+
+
+def build_dataset(audit_path, activity_path, out_dir, as_of=None, workers=None, chunk_size=500,
+                  spec=None):
+    as_of = as_of or datetime.now(timezone.utc)
+    workers = workers or os.cpu_count() or 1
+    pipeline = compile_features(spec)
+    os.makedirs(out_dir, exist_ok=True)
+
+    cases = iter_cases(iter_jsonl(audit_path), iter_jsonl(activity_path))
+    chunks = _chunks(cases, chunk_size, as_of, pipeline.spec)
+
+    # Stream chunk results to raw scratch files, then lay them out as .npy
+    x_names = ('X_data', 'X_indices', 'X_indptr') if pipeline.sparse else ('X',)
+    scratch = {name: open(os.path.join(out_dir, f'{name}.bin'), 'wb')
+               for name in x_names + ('y', 'snapshot_ts')}
+    n_rows = 0
+    n_positive = 0
+    nnz = 0
+    try:
+        if pipeline.sparse:
+            np.zeros(1, dtype=np.int64).tofile(scratch['X_indptr'])
+
+        if workers > 1:
+            pool = Pool(workers)
+            results = pool.imap(_featurise_chunk, chunks)
+        else:
+            pool = None
+            results = map(_featurise_chunk, chunks)
+
+        # Feature computation runs in the workers, so this times the
+        # end-to-end replay (read + join + featurise) as seen by the parent
+        with timer('feature_computation'):
+            for X, y, ts in results:
+                if pipeline.sparse:
+                    X.data.astype(np.float64).tofile(scratch['X_data'])
+                    X.indices.astype(np.int64).tofile(scratch['X_indices'])
+                    (X.indptr[1:].astype(np.int64) + nnz).tofile(scratch['X_indptr'])
+                    nnz += X.nnz
+                else:
+                    X.tofile(scratch['X'])
+                y.tofile(scratch['y'])
+                ts.tofile(scratch['snapshot_ts'])
+                n_rows += len(y)
+                n_positive += int(y.sum())
+                count('dataset_chunks')
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        for f in scratch.values():
+            f.close()
+
+    if pipeline.sparse:
+        layouts = {
+            'X_data': (np.float64, (nnz,)),
+            'X_indices': (np.int64, (nnz,)),
+            'X_indptr': (np.int64, (n_rows + 1,)),
+        }
+    else:
+        layouts = {'X': (np.float64, (n_rows, len(pipeline)))}
+    layouts.update({
+        'y': (np.int8, (n_rows,)),
+        'snapshot_ts': (np.float64, (n_rows,)),
+    })
+    with timer('dataset_write'):
+        _write_npy(out_dir, layouts, n_rows)
+    count('dataset_rows', n_rows)
+
+    meta = {
+        'feature_spec': pipeline.spec,
+        'columns': pipeline.columns,
+        'sparse': pipeline.sparse,
+        'n_rows': n_rows,
+        'n_positive': n_positive,
+        'as_of': as_of.isoformat(),
+        'label': f'recovered within {RECOVERY_WINDOW_DAYS} days of snapshot',
+    }
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"[OK] Wrote {n_rows} snapshots to {out_dir}")
+    if n_rows:
+        print(f"  Recovery rate: {n_positive / n_rows:.1%}")
+    return meta
+
+
+def load_dataset(path):
+    """Memory-map a dataset written by build_dataset(); returns (X, y, feature_spec)"""
+    with open(os.path.join(path, 'meta.json'), 'r') as f:
+        meta = json.load(f)
+
+    def load(name):
+        return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+
+    if meta.get('sparse'):
+        from scipy import sparse
+        X = sparse.csr_matrix(
+            (load('X_data'), load('X_indices'), load('X_indptr')),
+            shape=(meta['n_rows'], len(meta['columns'])),
+        )
+    else:
+        X = load('X')
+    return X, load('y'), meta.get('feature_spec')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--audit', required=True, help='case_audit JSON-lines export')
+    parser.add_argument('--activity', required=True, help='case_activity JSON-lines export')
+    parser.add_argument('--out', required=True, help='output directory')
+    parser.add_argument('--as-of', default=None,
+                        help='history cutoff (ISO-8601); snapshots whose label window '
+                             'extends past it are dropped. Defaults to now')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=500, help='cases per work unit')
+    parser.add_argument('--spec', default=None,
+                        help='feature spec JSON, or a model.json to take its spec from '
+                             '(default: six base features)')
+    args = parser.parse_args()
+
+    spec = load_feature_spec(args.spec) if args.spec else None
+
+    as_of = parse_timestamp(args.as_of) if args.as_of else None
+    build_dataset(args.audit, args.activity, args.out, as_of=as_of,
+                  workers=args.workers, chunk_size=args.chunk_size, spec=spec)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print(f"\n[ERROR] Error while building dataset: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -6,24 +6,25 @@ Validates that model predictions follow expected business logic
 
 import json
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-
-# Load model
-with open('model.json', 'r') as f:
-    model_data = json.load(f)
+from calibration import apply_calibration
+from instrumentation import timed
 
 def sigmoid(x):
     return 1 / (1 + np.exp(-x))
 
+@timed('scoring')
 def predict_recovery(features, model_data):
     """Predict recovery probability given features"""
     z = model_data['bias']
     for feat, value in features.items():
         z += model_data['weights'][feat] * value
-    return sigmoid(z)
+    return apply_calibration(sigmoid(z), model_data.get('calibration'))
 
-def run_sanity_tests():
+def run_sanity_tests(model_path='model.json'):
     """Run 6 critical business sanity checks"""
+    with open(model_path, 'r') as f:
+        model_data = json.load(f)
+    
     print("="*60)
     print("BUSINESS SANITY TESTS")
     print("="*60 + "\n")
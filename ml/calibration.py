@@ -0,0 +1,147 @@
+"""
+Probability calibration for the DCA recovery model.
+
+The logistic model's raw sigmoid output is not guaranteed to match observed
+recovery rates. This module fits an isotonic or Platt calibrator on held-out
+data and compresses it into a small piecewise-linear lookup table:
+
+    "calibration": {
+      "method": "isotonic",
+      "x": [0.012, 0.042, ..., 0.74],  # raw probability knots (ascending)
+      "y": [0.0033, 0.043, ..., 0.72]  # calibrated probability at each knot
+    }
+
+Both columns are strictly increasing and y stays within [eps, 1 - eps], so
+distinct raw scores keep distinct calibrated scores and no case is
+calibrated to exactly 0 or 1 (priority = amount * prob must still depend on
+amount). Raw scores outside the table take the nearest end value.
+
+At inference the table is applied with a single vectorized np.interp, so the
+scoring paths only need NumPy. sklearn is imported lazily on the fit path.
+"""
+
+import numpy as np
+
+CALIBRATION_METHODS = ('isotonic', 'platt')
+DEFAULT_MAX_KNOTS = 32
+DEFAULT_EPS = 1e-4
+
+
+def _knot_grid(raw_prob, max_knots):
+    """Knots at quantiles of the raw scores, pinned to [0, 1] at the ends"""
+    quantiles = np.quantile(raw_prob, np.linspace(0, 1, max_knots - 2))
+    return np.unique(np.concatenate([[0.0], quantiles, [1.0]]))
+
+
+def _pool_shrunk_blocks(sum_x, sum_y, sizes):
+    """
+    Shrink block rates to (k + 1) / (n + 2) and pool adjacent blocks until
+    the shrunk rates strictly increase (shrinkage can reorder small blocks).
+    Returns (block centroids, block rates).
+    """
+    pooled = []
+    for block in zip(sum_x, sum_y, sizes):
+        pooled.append(list(block))
+        while (len(pooled) > 1 and
+               (pooled[-1][1] + 1) / (pooled[-1][2] + 2) <= (pooled[-2][1] + 1) / (pooled[-2][2] + 2)):
+            sx, sy, n = pooled.pop()
+            pooled[-1][0] += sx
+            pooled[-1][1] += sy
+            pooled[-1][2] += n
+    pooled = np.array(pooled, dtype=float)
+    return pooled[:, 0] / pooled[:, 2], (pooled[:, 1] + 1) / (pooled[:, 2] + 2)
+
+
+def _fit_isotonic(raw_prob, y, max_knots):
+    """
+    Isotonic fit as the piecewise-linear curve through the centroids of its
+    constant blocks (mean raw score, block recovery rate), which is strictly
+    increasing. Block rates are shrunk to (k + 1) / (n + 2) so a small end
+    block of all-0 or all-1 outcomes does not pin the table to 0 or 1.
+    Resampled at quantiles of the raw scores when there are more blocks than
+    knots. Returns (knots, calibrated values).
+    """
+    from sklearn.isotonic import IsotonicRegression
+
+    iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+    fitted = iso.fit_transform(raw_prob, y)
+
+    order = np.argsort(raw_prob, kind='stable')
+    x_sorted, y_sorted, fitted = raw_prob[order], y[order], fitted[order]
+    starts = np.flatnonzero(np.r_[True, np.diff(fitted) != 0])
+    sizes = np.diff(np.r_[starts, len(x_sorted)])
+    block_x, block_y = _pool_shrunk_blocks(
+        np.add.reduceat(x_sorted, starts), np.add.reduceat(y_sorted, starts), sizes
+    )
+    if len(block_x) <= max_knots:
+        return block_x, block_y
+
+    inside = x_sorted[(x_sorted >= block_x[0]) & (x_sorted <= block_x[-1])]
+    quantiles = np.quantile(inside, np.linspace(0, 1, max_knots))[1:-1]
+    grid = np.unique(np.concatenate([[block_x[0]], quantiles, [block_x[-1]]]))
+    return grid, np.interp(grid, block_x, block_y)
+
+
+def _fit_platt(raw_prob, y, grid):
+    from sklearn.linear_model import LogisticRegression
+
+    eps = 1e-6
+    def logit(p):
+        p = np.clip(p, eps, 1 - eps)
+        return np.log(p / (1 - p))
+
+    platt = LogisticRegression(C=1e6, max_iter=1000)
+    platt.fit(logit(raw_prob).reshape(-1, 1), y)
+    return platt.predict_proba(logit(grid).reshape(-1, 1))[:, 1]
+
+
+def _strictly_increasing(x, y):
+    """Drop knots that do not increase both x and y over the previous kept knot"""
+    keep = [0]
+    for i in range(1, len(x)):
+        if x[i] > x[keep[-1]] and y[i] > y[keep[-1]]:
+            keep.append(i)
+    return x[keep], y[keep]
+
+
+def fit_calibration(raw_prob, y, method='isotonic', max_knots=DEFAULT_MAX_KNOTS,
+                    eps=DEFAULT_EPS):
+    """
+    Fit a calibrator on held-out (raw probability, outcome) pairs and return
+    it as a JSON-serialisable lookup table for model.json.
+    """
+    if method not in CALIBRATION_METHODS:
+        raise ValueError(f"Unknown calibration method '{method}' "
+                         f"(expected one of {CALIBRATION_METHODS})")
+
+    raw_prob = np.asarray(raw_prob, dtype=float)
+    y = np.asarray(y, dtype=float)
+    max_knots = max(max_knots, 3)
+
+    if method == 'isotonic':
+        grid, calibrated = _fit_isotonic(raw_prob, y, max_knots)
+    else:
+        grid = _knot_grid(raw_prob, max_knots)
+        calibrated = _fit_platt(raw_prob, y, grid)
+
+    # Keep off exactly 0/1, then drop knots that rounding or clipping made
+    # flat so the stored table is strictly increasing
+    calibrated = np.clip(calibrated, eps, 1 - eps)
+    grid, calibrated = _strictly_increasing(np.round(grid, 6), np.round(calibrated, 6))
+
+    return {
+        'method': method,
+        'n_samples': int(len(raw_prob)),
+        'x': [float(v) for v in grid],
+        'y': [float(v) for v in calibrated],
+    }
+
+
+def apply_calibration(prob, calibration):
+    """
+    Map raw probabilities through the lookup table (vectorized).
+    Returns the input unchanged when the model has no calibration block.
+    """
+    if not calibration:
+        return prob
+    return np.interp(prob, calibration['x'], calibration['y'])
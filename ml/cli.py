@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the ML toolchain.
+
+    python cli.py train  [--dataset DIR] [--spec spec.json] [--calibration isotonic|platt]
+    python cli.py score  [--model model.json] [--input cases.jsonl] [--output scores.jsonl]
+    python cli.py sanity [--model model.json]
+    python cli.py bench  [--model model.json] [--runs N]
+
+Each subcommand imports its own module only when it runs. sklearn is loaded
+on the train path only; score and sanity need nothing beyond NumPy.
+"""
+
+import argparse
+import json
+import sys
+
+
+def cmd_train(args):
+    from train_demo_model import train_model
+    train_model(dataset=args.dataset, spec_path=args.spec, calibration_method=args.calibration)
+    return 0
+
+
+def cmd_score(args):
+    from scoring import load_model, score_cases
+
+    model = load_model(args.model)
+    source = sys.stdin if args.input == '-' else open(args.input, 'r')
+    with source:
+        cases = [json.loads(line) for line in source if line.strip()]
+
+    results = score_cases(model, cases) if cases else []
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        for result in results:
+            out.write(json.dumps(result) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def cmd_sanity(args):
+    from business_sanity_tests import run_sanity_tests
+    return 0 if run_sanity_tests(args.model) else 1
+
+
+def cmd_bench(args):
+    from test_and_benchmark import run_tests
+    run_tests(args.model, cold_start_runs=args.runs)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ml', description='FedEx DCA ML toolchain')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train = subparsers.add_parser('train', help='train the model and write model.json')
+    train.add_argument('--dataset', default=None,
+                       help='directory written by build_dataset.py (default: synthetic data)')
+    train.add_argument('--spec', default=None,
+                       help='feature spec JSON, or a model.json to take its spec from, '
+                            'for synthetic training (default: six base features)')
+    train.add_argument('--calibration', default='isotonic', choices=('isotonic', 'platt'),
+                       help='probability calibration fitted on the held-out split')
+    train.set_defaults(func=cmd_train)
+
+    score = subparsers.add_parser('score', help='batch-score case records (JSON lines)')
+    score.add_argument('--model', default='model.json')
+    score.add_argument('--input', default='-', help="JSON-lines case records ('-' for stdin)")
+    score.add_argument('--output', default='-', help="JSON-lines scores ('-' for stdout)")
+    score.set_defaults(func=cmd_score)
+
+    sanity = subparsers.add_parser('sanity', help='run business sanity checks')
+    sanity.add_argument('--model', default='model.json')
+    sanity.set_defaults(func=cmd_sanity)
+
+    bench = subparsers.add_parser('bench', help='scenario benchmark and cold-start timings')
+    bench.add_argument('--model', default='model.json')
+    bench.add_argument('--runs', type=int, default=3, help='cold-start runs per command')
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Declarative feature spec and its compiled, vectorized transform pipeline.
+
+The spec lives in model.json under "feature_spec", so training, dataset
+building, batch scoring, online updates and the score_case Edge Function all
+read the same definition. Each entry produces one or more model columns:
+
+    {"name": "ageing", "type": "numeric", "source": "ageing_days",
+     "steps": [["divide", 120], ["min", 1]]}
+        One column. Steps run in order; available ops are divide, multiply,
+        add, log1p, min, max and clip(lo, hi). Missing values use "default"
+        (0 unless given).
+
+    {"name": "dispute", "type": "flag", "sources": ["has_dispute"],
+     "equals": {"status": "DISPUTE"}}
+        One 0/1 column: 1 if any source is truthy or any field equals the
+        given value.
+
+    {"name": "region", "type": "one_hot", "source": "region",
+     "categories": ["North", "South", "West"]}
+        One column per category ("region=North", ...). Unknown values are
+        all-zero.
+
+    {"name": "dca", "type": "hashed", "source": "assigned_dca_id", "buckets": 32}
+        `buckets` columns ("dca#0" ... "dca#31"); 32-bit FNV-1a of the value
+        selects the bucket (the Edge Function uses the same hash).
+
+Categorical values are matched and hashed by their category_key() text,
+which is what JavaScript's String() gives for the same JSON value: True is
+"true" and 3.0 is "3", so both sides pick the same column.
+
+A spec with only numeric/flag entries compiles to dense NumPy output. Any
+categorical entry switches the output to a scipy.sparse CSR matrix, so
+hundreds of one-hot/hashed columns cost memory only for non-zeros. scipy is
+imported only in that case.
+"""
+
+import json
+
+import numpy as np
+
+# The six original features, exactly as score_case computed them
+DEFAULT_FEATURE_SPEC = [
+    {'name': 'ageing', 'type': 'numeric', 'source': 'ageing_days',
+     'steps': [['divide', 120], ['min', 1]]},
+    {'name': 'log_amount', 'type': 'numeric', 'source': 'amount',
+     'steps': [['log1p'], ['divide', 10]]},
+    {'name': 'attempts', 'type': 'numeric', 'source': 'attempts_count',
+     'steps': [['divide', 10], ['min', 1]]},
+    {'name': 'staleness', 'type': 'numeric', 'source': 'days_since_last_update', 'default': 999,
+     'steps': [['divide', 14], ['min', 1]]},
+    {'name': 'dispute', 'type': 'flag', 'sources': ['has_dispute'],
+     'equals': {'status': 'DISPUTE'}},
+    {'name': 'ptp_active', 'type': 'flag', 'sources': ['ptp_active']},
+]
+
+DENSE_TYPES = ('numeric', 'flag')
+SPARSE_TYPES = ('one_hot', 'hashed')
+
+_STEPS = {
+    'divide': lambda x, d: x / d,
+    'multiply': lambda x, m: x * m,
+    'add': lambda x, a: x + a,
+    'log1p': lambda x: np.log1p(x),
+    'min': lambda x, hi: np.minimum(x, hi),
+    'max': lambda x, lo: np.maximum(x, lo),
+    'clip': lambda x, lo, hi: np.clip(x, lo, hi),
+}
+
+
+def category_key(value):
+    """Text of a categorical value, as String(value) writes it in score_case"""
+    if isinstance(value, (bool, np.bool_)):
+        return 'true' if value else 'false'
+    if isinstance(value, (float, np.floating)) and float(value).is_integer() and abs(value) < 1e21:
+        return str(int(value))
+    return str(value)
+
+
+def fnv1a_32(value):
+    """32-bit FNV-1a of the UTF-8 text of `value` (see category_key)"""
+    h = 0x811C9DC5
+    for byte in category_key(value).encode('utf-8'):
+        h = ((h ^ byte) * 0x01000193) & 0xFFFFFFFF
+    return h
+
+
+def _column(data, key, default=0.0):
+    values = data.get(key)
+    if values is None:
+        return None
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+        return values.astype(float, copy=False)
+    return np.array([default if v is None else v for v in values], dtype=float)
+
+
+def _to_columns(records, sources):
+    """List of record dicts -> dict of per-field lists (only the fields we need)"""
+    return {key: [r.get(key) for r in records] for key in sources}
+
+
+def _numeric_fn(entry):
+    for op, *_ in entry.get('steps', []):
+        if op not in _STEPS:
+            raise ValueError(f"Unknown step '{op}' in feature '{entry['name']}'")
+    steps = [(_STEPS[op], args) for op, *args in entry.get('steps', [])]
+    source = entry['source']
+    default = float(entry.get('default', 0.0))
+
+    def fn(data, n):
+        x = _column(data, source, default)
+        if x is None:
+            x = np.full(n, default)
+        for step, args in steps:
+            x = step(x, *args)
+        return x
+    return fn
+
+
+def _flag_fn(entry):
+    sources = entry.get('sources', [])
+    equals = entry.get('equals', {})
+
+    def fn(data, n):
+        x = np.zeros(n, dtype=bool)
+        for key in sources:
+            values = data.get(key)
+            if values is not None:
+                x |= np.array([bool(v) for v in values], dtype=bool)
+        for key, target in equals.items():
+            values = data.get(key)
+            if values is not None:
+                x |= np.array([v == target for v in values], dtype=bool)
+        return x.astype(float)
+    return fn
+
+
+def _categorical_fn(entry):
+    """Returns fn(data, n) -> (row_indices, column_offsets) of the 1.0 entries"""
+    source = entry['source']
+    if entry['type'] == 'one_hot':
+        index = {category_key(category): i for i, category in enumerate(entry['categories'])}
+
+        def lookup(value):
+            return index.get(category_key(value))
+    else:
+        buckets = int(entry['buckets'])
+        cache = {}
+
+        def lookup(value):
+            # Keyed by text: True, 1 and 1.0 are one dict key but different categories
+            key = category_key(value)
+            bucket = cache.get(key)
+            if bucket is None:
+                bucket = cache[key] = fnv1a_32(key) % buckets
+            return bucket
+
+    def fn(data, n):
+        values = data.get(source)
+        if values is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        rows, cols = [], []
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            col = lookup(value)
+            if col is not None:
+                rows.append(i)
+                cols.append(col)
+        return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+    return fn
+
+
+def _columns_for(entry):
+    if entry['type'] in DENSE_TYPES:
+        return [entry['name']]
+    if entry['type'] == 'one_hot':
+        return [f"{entry['name']}={category_key(c)}" for c in entry['categories']]
+    if entry['type'] == 'hashed':
+        return [f"{entry['name']}#{i}" for i in range(int(entry['buckets']))]
+    raise ValueError(f"Unknown feature type '{entry['type']}' for '{entry['name']}'")
+
+
+class FeaturePipeline:
+    """A feature spec compiled once into per-entry vectorized transforms"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.columns = []
+        self.column_owner = []  # spec entry name for each output column
+        self.binary_columns = set()
+        self.sources = set()
+        self._dense = []        # (column_index, fn)
+        self._sparse = []       # (first_column_index, fn)
+
+        for entry in spec:
+            names = _columns_for(entry)
+            start = len(self.columns)
+            self.columns.extend(names)
+            self.column_owner.extend([entry['name']] * len(names))
+            if entry['type'] != 'numeric':
+                self.binary_columns.update(names)
+
+            if entry['type'] == 'numeric':
+                self._dense.append((start, _numeric_fn(entry)))
+                self.sources.add(entry['source'])
+            elif entry['type'] == 'flag':
+                self._dense.append((start, _flag_fn(entry)))
+                self.sources.update(entry.get('sources', []))
+                self.sources.update(entry.get('equals', {}))
+            else:
+                self._sparse.append((start, _categorical_fn(entry)))
+                self.sources.add(entry['source'])
+
+        self.sparse = bool(self._sparse)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def transform(self, data):
+        """
+        Transform raw inputs into the model matrix.
+        `data` is a list of record dicts or a dict of equal-length columns.
+        Returns an (n, len(columns)) ndarray, or a CSR matrix if the spec is sparse.
+        """
+        if isinstance(data, list):
+            data = _to_columns(data, self.sources)
+        n = len(next(iter(data.values()))) if data else 0
+
+        if not self.sparse:
+            X = np.zeros((n, len(self.columns)))
+            for col, fn in self._dense:
+                X[:, col] = fn(data, n)
+            return X
+
+        from scipy import sparse
+
+        rows, cols, vals = [], [], []
+        for col, fn in self._dense:
+            x = fn(data, n)
+            nz = np.flatnonzero(x)
+            rows.append(nz)
+            cols.append(np.full(len(nz), col, dtype=np.int64))
+            vals.append(x[nz])
+        for start, fn in self._sparse:
+            r, c = fn(data, n)
+            rows.append(r)
+            cols.append(c + start)
+            vals.append(np.ones(len(r)))
+
+        return sparse.csr_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(n, len(self.columns)),
+        )
+
+    def weight_vector(self, weights):
+        """model.json "weights" dict -> vector in column order (missing = 0)"""
+        return np.array([float(weights.get(c, 0.0)) for c in self.columns])
+
+
+def load_feature_spec(path):
+    """Read a spec from a JSON list, or from the "feature_spec" of a model.json"""
+    with open(path, 'r') as f:
+        spec = json.load(f)
+    if isinstance(spec, dict):
+        spec = spec.get('feature_spec')
+    return spec
+
+
+def default_reason_mappings(spec):
+    """
+    Generic reason text for every spec entry, in model.json "reason_mappings"
+    form: [low, medium, high] for numeric and flag entries, one string per
+    column for one_hot entries, one string per entry for hashed entries.
+    """
+    mappings = {}
+    for entry in spec:
+        name = entry['name']
+        label = name.replace('_', ' ')
+        if entry['type'] == 'numeric':
+            mappings[name] = [f"Low {label}", f"Medium {label}", f"High {label}"]
+        elif entry['type'] == 'flag':
+            mappings[name] = [f"No {label}", f"{label.capitalize()} present",
+                              f"{label.capitalize()} present"]
+        elif entry['type'] == 'one_hot':
+            source = entry['source'].replace('_', ' ')
+            for category in map(category_key, entry['categories']):
+                mappings[f"{name}={category}"] = f"{source.capitalize()} is {category}"
+        else:
+            mappings[name] = f"{label.capitalize()} group affects recovery"
+    return mappings
+
+
+def compile_features(spec=None):
+    return FeaturePipeline(spec if spec is not None else DEFAULT_FEATURE_SPEC)
+
+
+def model_pipeline(model):
+    """Pipeline for a loaded model.json (older models use the default spec)"""
+    return compile_features(model.get('feature_spec'))
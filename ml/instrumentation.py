@@ -0,0 +1,199 @@
+"""
+Lightweight timing, counter and memory instrumentation for the ML scripts.
+
+Disabled unless one of these environment variables is set:
+
+    ML_METRICS_FILE=metrics.json   export timers/counters/peak RSS at exit
+                                   (a .prom/.txt suffix selects Prometheus
+                                   text exposition format instead of JSON)
+    ML_PROFILE=cprofile            also run cProfile, dump to ML_PROFILE_FILE
+    ML_PROFILE=tracemalloc         also trace allocations, write top sites to
+                                   ML_PROFILE_FILE
+
+When disabled, `timer()` returns a shared no-op context manager, `timed()`
+returns the function unchanged and `count()` returns immediately, so the
+hooks can stay in production batch jobs.
+
+    from instrumentation import timer, timed, count
+
+    with timer('fit'):
+        model.fit(X, y)
+
+    @timed('scoring')
+    def predict(...): ...
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+
+METRICS_FILE = os.environ.get('ML_METRICS_FILE')
+PROFILE_MODE = os.environ.get('ML_PROFILE', '').strip().lower()
+PROFILE_FILE = os.environ.get('ML_PROFILE_FILE')
+ENABLED = bool(METRICS_FILE or PROFILE_MODE)
+
+_timers = {}    # name -> [calls, total_seconds, max_seconds]
+_counters = {}  # name -> value
+_peak_rss = 0
+_profiler = None
+
+
+def _rss_bytes():
+    """Peak resident set size of this process so far"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def sample_rss():
+    global _peak_rss
+    if ENABLED:
+        _peak_rss = max(_peak_rss, _rss_bytes())
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stats = _timers.get(self.name)
+        if stats is None:
+            _timers[self.name] = [1, elapsed, elapsed]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+        sample_rss()
+        return False
+
+
+def timer(name):
+    """Context manager recording wall time under `name`"""
+    return _Timer(name) if ENABLED else _NULL_TIMER
+
+
+def timed(name=None):
+    """Decorator form of timer(); a no-op when instrumentation is disabled"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    if ENABLED:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot():
+    """Current metrics as a plain dict"""
+    sample_rss()
+    return {
+        'timers': {
+            name: {'calls': calls, 'total_seconds': total, 'max_seconds': peak}
+            for name, (calls, total, peak) in sorted(_timers.items())
+        },
+        'counters': dict(sorted(_counters.items())),
+        'peak_rss_bytes': _peak_rss,
+    }
+
+
+def _prometheus_text(metrics):
+    lines = [
+        '# TYPE ml_timer_calls_total counter',
+        *(f'ml_timer_calls_total{{name="{n}"}} {t["calls"]}' for n, t in metrics['timers'].items()),
+        '# TYPE ml_timer_seconds_total counter',
+        *(f'ml_timer_seconds_total{{name="{n}"}} {t["total_seconds"]:.6f}' for n, t in metrics['timers'].items()),
+        '# TYPE ml_timer_seconds_max gauge',
+        *(f'ml_timer_seconds_max{{name="{n}"}} {t["max_seconds"]:.6f}' for n, t in metrics['timers'].items()),
+        '# TYPE ml_counter_total counter',
+        *(f'ml_counter_total{{name="{n}"}} {v}' for n, v in metrics['counters'].items()),
+        '# TYPE ml_peak_rss_bytes gauge',
+        f'ml_peak_rss_bytes {metrics["peak_rss_bytes"]}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def export(path=None):
+    """Write metrics to `path` (default ML_METRICS_FILE) as JSON or Prometheus text"""
+    path = path or METRICS_FILE
+    if not path:
+        return
+    metrics = snapshot()
+    with open(path, 'w') as f:
+        if path.endswith(('.prom', '.txt')):
+            f.write(_prometheus_text(metrics))
+        else:
+            json.dump(metrics, f, indent=2)
+
+
+def _start_profiling():
+    global _profiler
+    if PROFILE_MODE == 'cprofile':
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    elif PROFILE_MODE == 'tracemalloc':
+        import tracemalloc
+        tracemalloc.start(25)
+
+
+def _stop_profiling():
+    if PROFILE_MODE == 'cprofile' and _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(PROFILE_FILE or 'ml_profile.prof')
+    elif PROFILE_MODE == 'tracemalloc':
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        _counters['tracemalloc_peak_bytes'] = peak
+        top = tracemalloc.take_snapshot().statistics('lineno')[:25]
+        tracemalloc.stop()
+        with open(PROFILE_FILE or 'ml_tracemalloc.txt', 'w') as f:
+            f.write(f'current={current} peak={peak}\n')
+            for stat in top:
+                f.write(f'{stat}\n')
+
+
+def _at_exit():
+    _stop_profiling()
+    export()
+
+
+if ENABLED:
+    _start_profiling()
+    atexit.register(_at_exit)
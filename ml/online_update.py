@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Incremental online updates of the recovery model from resolved cases.
+
+Cases that reach RECOVERED or CLOSED with a closure_reason are new labelled
+examples. This script consumes a time-ordered export of `case_audit` (JSON
+lines, one audit row per line) as a stream and:
+
+1. Remembers the features recorded by the most recent CASE_SCORED event of
+   each open case (score_case stores them under `after.features`, keyed by
+   the model's feature-spec columns)
+2. When the case closes, joins the closure to that snapshot and labels it
+   1 if it was RECOVERED within 30 days of scoring, else 0
+3. Routes a stable ~20% of cases (by case_id hash) into two fixed-size
+   holdout reservoirs, half for refitting the calibration table and half
+   for evaluation, and uses the rest for mini-batch AdaGrad updates of the
+   logistic weights, starting from the currently published model.json
+4. Periodically compares the calibrated candidate against the calibrated
+   published model on the evaluation reservoir and writes a new model.json
+   version only when log loss improves
+
+Memory is bounded by --max-open-cases, --holdout-size and --batch-size,
+independent of the length of the stream.
+
+Usage:
+    python online_update.py --audit case_audit.jsonl
+    cat case_audit.jsonl | python online_update.py --audit -
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from calibration import apply_calibration, fit_calibration
+from features import model_pipeline
+from instrumentation import timer, timed, count
+
+RECOVERY_WINDOW_DAYS = 30
+CLOSED_STATUSES = ('RECOVERED', 'CLOSED')
+
+
+def sigmoid(z):
+    return 1 / (1 + np.exp(-z))
+
+
+def parse_timestamp(value):
+    """Parse a Postgres/ISO-8601 timestamp (accepts a trailing 'Z'; naive means UTC)"""
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def iter_audit_events(path):
+    """Yield audit rows from a JSON-lines export ('-' reads stdin)"""
+    f = sys.stdin if path == '-' else open(path, 'r')
+    try:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def stream_labelled_examples(events, columns, max_open_cases=100000,
+                             window_days=RECOVERY_WINDOW_DAYS):
+    """
+    Join case closures to the features the case had when it was last scored.
+
+    Yields (case_id, feature_vector, label), the vector in `columns` order
+    (columns missing from the recorded features are 0). Snapshots of open cases are held
+    in an LRU map capped at `max_open_cases`; the oldest-scored case is
+    evicted first when the cap is reached.
+
+    Resolved cases stay in the map as a None marker, so a case rescored after
+    it was resolved (both case pages allow it) is not turned into a second
+    example built from post-resolution features.
+    """
+    snapshots = OrderedDict()
+
+    for event in events:
+        case_id = event.get('case_id')
+        after = event.get('after') or {}
+
+        if event.get('action') == 'CASE_SCORED' and after.get('features'):
+            if case_id in snapshots and snapshots[case_id] is None:
+                continue  # scored after resolution, not a prediction target
+            snapshots.pop(case_id, None)
+            snapshots[case_id] = (parse_timestamp(event['created_at']), after['features'])
+            if len(snapshots) > max_open_cases:
+                snapshots.popitem(last=False)
+            continue
+
+        if after.get('status') in CLOSED_STATUSES and after.get('closure_reason'):
+            # The None marker also de-duplicates: the DB trigger and
+            # transition_case both audit the same transition, and RECOVERED
+            # is later CLOSED
+            snapshot = snapshots.pop(case_id, None)
+            snapshots[case_id] = None
+            if len(snapshots) > max_open_cases:
+                snapshots.popitem(last=False)
+            if snapshot is None:
+                continue
+            scored_at, features = snapshot
+            closed_at = parse_timestamp(after.get('closed_at') or event['created_at'])
+            if scored_at >= closed_at:
+                continue
+            recovered = (
+                after['closure_reason'] == 'RECOVERED'
+                and closed_at <= scored_at + timedelta(days=window_days)
+            )
+            x = np.array([float(features.get(c, 0)) for c in columns])
+            yield case_id, x, int(recovered)
+
+
+def holdout_split(case_id, holdout_pct=20, calibration_pct=10):
+    """
+    Stable case-level split so a case never lands on two sides. Returns
+    'calibration' or 'evaluation' for holdout cases, None for training cases.
+    """
+    bucket = zlib.crc32(str(case_id).encode()) % 100
+    if bucket < calibration_pct:
+        return 'calibration'
+    if bucket < holdout_pct:
+        return 'evaluation'
+    return None
+
+
+class HoldoutReservoir:
+    """Fixed-capacity uniform sample of the holdout stream (Algorithm R)"""
+
+    def __init__(self, capacity, n_features, seed=42):
+        self.X = np.zeros((capacity, n_features))
+        self.y = np.zeros(capacity)
+        self.capacity = capacity
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, x, label):
+        if self.seen < self.capacity:
+            slot = self.seen
+        else:
+            slot = self._rng.integers(0, self.seen + 1)
+        if slot < self.capacity:
+            self.X[slot] = x
+            self.y[slot] = label
+        self.seen += 1
+
+    def __len__(self):
+        return min(self.seen, self.capacity)
+
+    def data(self):
+        n = len(self)
+        return self.X[:n], self.y[:n]
+
+
+class OnlineLogisticRegression:
+    """Logistic regression updated by mini-batch AdaGrad with L2 penalty"""
+
+    def __init__(self, weights, bias, learning_rate=0.05, l2=1e-4):
+        self.weights = np.asarray(weights, dtype=float).copy()
+        self.bias = float(bias)
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.n_updates = 0
+        self._g2_w = np.full_like(self.weights, 1e-8)
+        self._g2_b = 1e-8
+
+    def predict_proba(self, X):
+        return sigmoid(X @ self.weights + self.bias)
+
+    def partial_fit(self, X, y):
+        err = self.predict_proba(X) - y
+        grad_w = X.T @ err / len(y) + self.l2 * self.weights
+        grad_b = err.mean()
+
+        self._g2_w += grad_w ** 2
+        self._g2_b += grad_b ** 2
+        self.weights -= self.learning_rate * grad_w / np.sqrt(self._g2_w)
+        self.bias -= self.learning_rate * grad_b / np.sqrt(self._g2_b)
+        self.n_updates += len(y)
+
+
+def log_loss(y, prob, eps=1e-12):
+    prob = np.clip(prob, eps, 1 - eps)
+    return float(-np.mean(y * np.log(prob) + (1 - y) * np.log(1 - prob)))
+
+
+def roc_auc(y, prob):
+    """Rank-based (Mann-Whitney) ROC-AUC, NumPy only"""
+    n_pos = int(y.sum())
+    n_neg = len(y) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return float('nan')
+    order = np.argsort(prob, kind='mergesort')
+    ranks = np.empty(len(prob))
+    ranks[order] = np.arange(1, len(prob) + 1)
+    # Average ranks over ties
+    sorted_prob = prob[order]
+    _, first, counts = np.unique(sorted_prob, return_index=True, return_counts=True)
+    for start, count in zip(first, counts):
+        if count > 1:
+            ranks[order[start:start + count]] = start + (count + 1) / 2
+    return float((ranks[y == 1].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def bump_version(version):
+    """'1.0' -> '1.1', '2.3' -> '2.4'"""
+    parts = str(version).split('.')
+    try:
+        parts[-1] = str(int(parts[-1]) + 1)
+    except ValueError:
+        parts.append('1')
+    return '.'.join(parts)
+
+
+def write_model_atomic(model_data, path):
+    """Write model.json via a temp file so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    # mkstemp creates the file 0600; keep the destination's mode (or 0644)
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(model_data, f, indent=2)
+        os.chmod(tmp_path, mode)  # os.chmod rather than fchmod: also available on Windows
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@timed('evaluation')
+def publish_if_better(published, candidate, evaluation, calibration_set, model_data, out_path,
+                      min_improvement, columns):
+    """
+    Compare calibrated candidate vs calibrated published model on the
+    evaluation reservoir, i.e. the probabilities that would actually be
+    served. The candidate's calibration table is refitted on the separate
+    calibration reservoir. Returns the updated model_data if a new version
+    was written, else None.
+    """
+    # The old calibration table was fitted to the old raw scores
+    calibration = None
+    if model_data.get('calibration'):
+        X_cal, y_cal = calibration_set.data()
+        calibration = fit_calibration(
+            candidate.predict_proba(X_cal), y_cal, method=model_data['calibration']['method']
+        )
+
+    X, y = evaluation.data()
+    current_prob = apply_calibration(published.predict_proba(X), model_data.get('calibration'))
+    candidate_prob = apply_calibration(candidate.predict_proba(X), calibration)
+    current_loss = log_loss(y, current_prob)
+    candidate_loss = log_loss(y, candidate_prob)
+
+    print(f"  Holdout ({len(y)} cases): log loss {current_loss:.4f} -> {candidate_loss:.4f}")
+    if candidate_loss > current_loss - min_improvement:
+        print("  Candidate not better, keeping published model")
+        return None
+
+    new_model = dict(model_data)
+    new_model['version'] = bump_version(model_data.get('version', '1.0'))
+    new_model['trained_on'] = date.today().isoformat()
+    new_model['bias'] = float(candidate.bias)
+    new_model['weights'] = {c: float(w) for c, w in zip(columns, candidate.weights)}
+    new_model['online_updates'] = int(model_data.get('online_updates', 0) + candidate.n_updates)
+    new_model['holdout_log_loss'] = candidate_loss
+    new_model['holdout_auc'] = roc_auc(y, candidate_prob)
+    if calibration is not None:
+        new_model['calibration'] = calibration
+
+    write_model_atomic(new_model, out_path)
+    print(f"[OK] Published model v{new_model['version']} to {out_path}")
+    return new_model
+
+
+def run_online_update(audit_path, model_path='model.json', out_path=None, batch_size=64,
+                      eval_every=1000, holdout_size=2000, min_holdout=200,
+                      learning_rate=0.05, l2=1e-4, min_improvement=1e-4,
+                      max_open_cases=100000):
+    out_path = out_path or model_path
+
+    with open(model_path, 'r') as f:
+        model_data = json.load(f)
+    pipeline = model_pipeline(model_data)
+    n_columns = len(pipeline)
+
+    def from_model(data):
+        return OnlineLogisticRegression(
+            pipeline.weight_vector(data['weights']), data['bias'],
+            learning_rate=learning_rate, l2=l2,
+        )
+
+    published = from_model(model_data)
+    candidate = from_model(model_data)
+    holdout = {
+        'calibration': HoldoutReservoir(holdout_size, n_columns, seed=41),
+        'evaluation': HoldoutReservoir(holdout_size, n_columns, seed=42),
+    }
+
+    batch_X = np.zeros((batch_size, n_columns))
+    batch_y = np.zeros(batch_size)
+    batch_n = 0
+    n_train = 0
+    n_published = 0
+    since_eval = 0
+
+    print(f"[OK] Loaded model v{model_data.get('version')} from {model_path}")
+    print(f"Streaming resolved cases from {'stdin' if audit_path == '-' else audit_path}...\n")
+
+    def maybe_publish():
+        nonlocal model_data, published, n_published
+        if len(holdout['evaluation']) < min_holdout:
+            return
+        if model_data.get('calibration') and len(holdout['calibration']) < min_holdout:
+            return
+        new_model = publish_if_better(
+            published, candidate, holdout['evaluation'], holdout['calibration'],
+            model_data, out_path, min_improvement, pipeline.columns,
+        )
+        if new_model is not None:
+            model_data = new_model
+            published = from_model(model_data)
+            n_published += 1
+
+    examples = stream_labelled_examples(
+        iter_audit_events(audit_path), pipeline.columns, max_open_cases
+    )
+    for case_id, x, label in examples:
+        side = holdout_split(case_id)
+        if side is not None:
+            holdout[side].add(x, label)
+            continue
+
+        batch_X[batch_n] = x
+        batch_y[batch_n] = label
+        batch_n += 1
+        if batch_n == batch_size:
+            with timer('fit'):
+                candidate.partial_fit(batch_X, batch_y)
+            count('online_train_rows', batch_n)
+            n_train += batch_n
+            since_eval += batch_n
+            batch_n = 0
+
+        if since_eval >= eval_every:
+            since_eval = 0
+            maybe_publish()
+
+    if batch_n:
+        candidate.partial_fit(batch_X[:batch_n], batch_y[:batch_n])
+        n_train += batch_n
+    maybe_publish()
+
+    n_holdout = sum(r.seen for r in holdout.values())
+    print(f"\n[OK] Processed {n_train} training cases, {n_holdout} holdout cases")
+    print(f"  Published versions: {n_published}")
+    return n_published
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--audit', required=True,
+                        help="case_audit JSON-lines export in created_at order ('-' for stdin)")
+    parser.add_argument('--model', default='model.json', help='published model to start from')
+    parser.add_argument('--out', default=None, help='where to publish (defaults to --model)')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--eval-every', type=int, default=1000)
+    parser.add_argument('--holdout-size', type=int, default=2000,
+                        help='capacity of each holdout reservoir (calibration, evaluation)')
+    parser.add_argument('--min-holdout', type=int, default=200)
+    parser.add_argument('--learning-rate', type=float, default=0.05)
+    parser.add_argument('--min-improvement', type=float, default=1e-4)
+    parser.add_argument('--max-open-cases', type=int, default=100000)
+    args = parser.parse_args()
+
+    run_online_update(
+        args.audit, model_path=args.model, out_path=args.out,
+        batch_size=args.batch_size, eval_every=args.eval_every,
+        holdout_size=args.holdout_size, min_holdout=args.min_holdout,
+        learning_rate=args.learning_rate, min_improvement=args.min_improvement,
+        max_open_cases=args.max_open_cases,
+    )
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print(f"\n[ERROR] Error during online update: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,137 @@
+"""
+NumPy-only batch scoring, mirroring the score_case Edge Function.
+
+Input records carry the same fields score_case reads from `cases` and derives
+from `case_activity`:
+
+    {"id": "...", "amount": 125000, "ageing_days": 45, "status": "IN_PROGRESS",
+     "attempts_count": 3, "days_since_last_update": 2,
+     "has_dispute": false, "ptp_active": true}
+
+Features come from the model's feature spec (see features.py). Nothing here
+imports sklearn, so on-call scoring checks start fast.
+"""
+
+import json
+
+import numpy as np
+
+from calibration import apply_calibration
+from features import model_pipeline
+from instrumentation import timed
+
+NO_ACTIVITY_DAYS = 999  # score_case's value when a case has no activity
+
+
+def load_model(path='model.json'):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def sigmoid(z):
+    return 1 / (1 + np.exp(-z))
+
+
+def _column(cases, key, default=0):
+    values = (c.get(key) for c in cases)
+    return np.array([default if v is None else v for v in values], dtype=float)
+
+
+@timed('feature_computation')
+def compute_features(cases, pipeline):
+    """Model matrix for a batch of raw case records (dense or CSR)"""
+    return pipeline.transform(cases)
+
+
+@timed('scoring')
+def predict_proba(model, X, pipeline=None):
+    """Calibrated recovery probability for each row of X"""
+    pipeline = pipeline or model_pipeline(model)
+    weights = pipeline.weight_vector(model['weights'])
+    raw = sigmoid(np.asarray(X @ weights).ravel() + model['bias'])
+    return apply_calibration(raw, model.get('calibration'))
+
+
+def priority_scores(amount, prob, ageing_days, days_since_update):
+    """Priority = (amount * recovery_prob) - (0.3 * ageing) - (0.2 * staleness)"""
+    return amount * prob - 0.3 * ageing_days - 0.2 * days_since_update
+
+
+def _reason_text(mapping, binary, value):
+    # reason_mappings are either a single string or [low, medium, high]
+    if isinstance(mapping, str):
+        return mapping
+    if binary:
+        return mapping[2 if value == 1 else 0]
+    return mapping[0 if value < 0.33 else 1 if value < 0.67 else 2]
+
+
+def _ranked_contributions(X, weights, candidates):
+    """
+    Yield (column_indices, values) per row, ordered by |contribution|.
+    Only `candidates` columns are ranked; for CSR input only columns with a
+    non-zero contribution are (same as score_case for sparse specs).
+    """
+    if hasattr(X, 'tocsr'):
+        X = X.tocsr()
+        X.sum_duplicates()  # one stored entry per (row, column)
+        # Work on the CSR arrays directly: indexing back into X costs far
+        # more per row than the ranking itself
+        indptr, indices, data = X.indptr, X.indices, X.data
+        for i in range(X.shape[0]):
+            cols = indices[indptr[i]:indptr[i + 1]]
+            values = data[indptr[i]:indptr[i + 1]]
+            contributions = values * weights[cols]
+            keep = (contributions != 0) & candidates[cols]
+            order = np.argsort(-np.abs(contributions[keep]), kind='stable')
+            yield cols[keep][order], values[keep][order]
+    else:
+        columns = np.flatnonzero(candidates)
+        ranked = columns[np.argsort(-np.abs(X[:, columns] * weights[columns]), axis=1, kind='stable')]
+        for i, row in enumerate(ranked):
+            yield row, X[i, row]
+
+
+@timed('reason_codes')
+def reason_codes(model, X, pipeline=None, top_k=3):
+    """
+    Top-k columns by absolute contribution for each row. Columns with no
+    entry in reason_mappings (by column, then by spec entry) are skipped, so
+    raw column names never reach users.
+    """
+    pipeline = pipeline or model_pipeline(model)
+    weights = pipeline.weight_vector(model['weights'])
+    mappings = model.get('reason_mappings', {})
+    column_mappings = [mappings.get(c, mappings.get(owner))
+                       for c, owner in zip(pipeline.columns, pipeline.column_owner)]
+    candidates = np.array([m is not None for m in column_mappings], dtype=bool)
+
+    reasons = []
+    for cols, values in _ranked_contributions(X, weights, candidates):
+        reasons.append([
+            _reason_text(column_mappings[j], pipeline.columns[j] in pipeline.binary_columns, value)
+            for j, value in zip(cols[:top_k], values[:top_k])
+        ])
+    return reasons
+
+
+def score_cases(model, cases, pipeline=None):
+    """Score a batch of raw case records; returns one result dict per case"""
+    pipeline = pipeline or model_pipeline(model)
+    X = compute_features(cases, pipeline)
+    prob = predict_proba(model, X, pipeline)
+    priority = priority_scores(
+        _column(cases, 'amount'), prob,
+        _column(cases, 'ageing_days'),
+        _column(cases, 'days_since_last_update', NO_ACTIVITY_DAYS),
+    )
+    reasons = reason_codes(model, X, pipeline)
+    return [
+        {
+            'case_id': case.get('id'),
+            'recovery_prob_30d': float(prob[i]),
+            'priority_score': float(priority[i]),
+            'reason_codes': reasons[i],
+        }
+        for i, case in enumerate(cases)
+    ]
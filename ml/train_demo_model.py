@@ -9,22 +9,22 @@ In a production scenario, you would:
 3. Export coefficients to model.json
 """
 
+import argparse
 import json
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
+from calibration import CALIBRATION_METHODS, fit_calibration, apply_calibration
+from features import compile_features, default_reason_mappings, load_feature_spec
+from instrumentation import timer, timed, count
 import warnings
 warnings.filterwarnings('ignore')
 
-# Feature names (must match what Edge Function expects)
-FEATURES = ['ageing', 'log_amount', 'attempts', 'staleness', 'dispute', 'ptp_active']
-
-def generate_synthetic_data(n_samples=5000):
+@timed('data_generation')
+def generate_synthetic_data(n_samples=5000, pipeline=None):
     """
     Generate realistic synthetic debt collection cases for training.
     
-    Features match EXACTLY the production Edge Function calculations:
+    Raw case fields are run through the feature spec pipeline (features.py),
+    the same one the Edge Function and batch scoring use. With the default spec:
     - ageing: normalized (0-1), ageing_days/120, capped at 1
     - log_amount: ln(amount+1)/10
     - attempts: normalized (0-1), attempts_count/10, capped at 1  
@@ -75,8 +75,6 @@ def generate_synthetic_data(n_samples=5000):
     ptp_prob = np.clip(ptp_prob, 0, 0.6)
     ptp_active = np.random.binomial(1, ptp_prob, n_samples)
     
-    X = np.column_stack([ageing, log_amount, attempts, staleness, dispute, ptp_active])
-    
     # Generate recovery labels with realistic business logic
     # Base probability starts at 0.4 (40% base recovery rate)
     logit = (
@@ -98,6 +96,26 @@ def generate_synthetic_data(n_samples=5000):
     # Generate binary outcomes
     y = (np.random.uniform(0, 1, n_samples) < prob).astype(int)
     
+    # Categorical fields (no effect on the label) so specs with one-hot or
+    # hashed entries have something to encode; drawn last to keep the
+    # numeric features and labels above unchanged
+    status = np.where(dispute == 1, 'DISPUTE',
+                      np.random.choice(['NEW', 'IN_PROGRESS'], n_samples))
+    assigned_dca_id = np.random.choice([f'dca-{i:02d}' for i in range(8)], n_samples)
+    
+    # The model matrix comes from the shared feature spec, applied to raw fields
+    pipeline = pipeline or compile_features()
+    X = pipeline.transform({
+        'ageing_days': ageing_days_raw,
+        'amount': amount_raw,
+        'attempts_count': attempts_raw.astype(float),
+        'days_since_last_update': staleness_days_raw,
+        'has_dispute': dispute,
+        'ptp_active': ptp_active,
+        'status': status,
+        'assigned_dca_id': assigned_dca_id,
+    })
+    
     print(f"[OK] Generated {n_samples} cases")
     print(f"  Recovery rate: {y.mean():.1%}")
     print(f"  Avg ageing (norm): {ageing.mean():.2f}")
@@ -107,22 +125,54 @@ def generate_synthetic_data(n_samples=5000):
     
     return X, y
 
-def train_model():
-    """Train logistic regression model with validation"""
+def train_model(dataset=None, spec_path=None, calibration_method='isotonic'):
+    """
+    Train logistic regression model with validation.
+    Uses a build_dataset.py output directory if given, else synthetic data.
+    The feature spec comes from the dataset (it was built with one), else
+    from `spec_path`, else the default six features.
+    """
+    # sklearn is only needed here; importing it lazily keeps the scoring and
+    # sanity-check paths (which import this module's helpers) fast to start
+    with timer('sklearn_import'):
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import (
+            brier_score_loss, classification_report, confusion_matrix, roc_auc_score
+        )
+    
     print("\n" + "="*60)
     print("FedEx DCA Platform - ML Model Training")
     print("="*60 + "\n")
     
-    # Generate data
-    X, y = generate_synthetic_data(n_samples=5000)
+    if dataset:
+        from build_dataset import load_dataset
+        with timer('dataset_load'):
+            X, y, spec = load_dataset(dataset)
+        pipeline = compile_features(spec)
+        print(f"[OK] Loaded {len(y)} snapshots from {dataset}")
+        print(f"  Recovery rate: {y.mean():.1%}")
+    else:
+        spec = load_feature_spec(spec_path) if spec_path else None
+        pipeline = compile_features(spec)
+        X, y = generate_synthetic_data(n_samples=5000, pipeline=pipeline)
+    print(f"  Feature columns: {len(pipeline)} ({'sparse CSR' if pipeline.sparse else 'dense'})")
     
     # Split into train/test
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    
-    print(f"\nTraining set: {len(X_train)} cases")
-    print(f"Test set: {len(X_test)} cases\n")
+    with timer('split'):
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=y
+        )
+        
+        # Hold out part of the training set to fit probability calibration
+        X_train, X_calib, y_train, y_calib = train_test_split(
+            X_train, y_train, test_size=0.25, random_state=42, stratify=y_train
+        )
+    count('train_rows', len(y_train))
+    
+    print(f"\nTraining set: {len(y_train)} cases")
+    print(f"Calibration set: {len(y_calib)} cases")
+    print(f"Test set: {len(y_test)} cases\n")
     
     # Train model
     print("Training logistic regression model...")
@@ -132,7 +182,8 @@ def train_model():
         solver='lbfgs',
         C=1.0
     )
-    model.fit(X_train, y_train)
+    with timer('fit'):
+        model.fit(X_train, y_train)
     print("[OK] Model trained\n")
     
     # Evaluate
@@ -140,17 +191,18 @@ def train_model():
     print("MODEL PERFORMANCE")
     print("="*60)
     
-    train_acc = model.score(X_train, y_train)
-    test_acc = model.score(X_test, y_test)
-    
-    y_pred_train = model.predict(X_train)
-    y_pred_test = model.predict(X_test)
-    
-    y_proba_train = model.predict_proba(X_train)[:, 1]
-    y_proba_test = model.predict_proba(X_test)[:, 1]
-    
-    train_auc = roc_auc_score(y_train, y_proba_train)
-    test_auc = roc_auc_score(y_test, y_proba_test)
+    with timer('evaluation'):
+        train_acc = model.score(X_train, y_train)
+        test_acc = model.score(X_test, y_test)
+        
+        y_pred_train = model.predict(X_train)
+        y_pred_test = model.predict(X_test)
+        
+        y_proba_train = model.predict_proba(X_train)[:, 1]
+        y_proba_test = model.predict_proba(X_test)[:, 1]
+        
+        train_auc = roc_auc_score(y_train, y_proba_train)
+        test_auc = roc_auc_score(y_test, y_proba_test)
     
     print(f"\nAccuracy:")
     print(f"  Training: {train_acc:.1%}")
@@ -168,7 +220,6 @@ def train_model():
     print(classification_report(y_test, y_pred_test, target_names=['Not Recovered', 'Recovered']))
     
     # Brier Score (calibration metric)
-    from sklearn.metrics import brier_score_loss
     brier_train = brier_score_loss(y_train, y_proba_train)
     brier_test = brier_score_loss(y_test, y_proba_test)
     
@@ -177,16 +228,28 @@ def train_model():
     print(f"  Test:     {brier_test:.4f}")
     print(f"  Note: Measures how well predicted probabilities match actual outcomes")
     
+    # Probability calibration (fitted on the held-out calibration set)
+    with timer('calibration'):
+        calibration = fit_calibration(
+            model.predict_proba(X_calib)[:, 1], y_calib, method=calibration_method
+        )
+    y_proba_test_cal = apply_calibration(y_proba_test, calibration)
+    brier_test_cal = brier_score_loss(y_test, y_proba_test_cal)
+    
+    print(f"\nCalibration ({calibration['method']}, {len(calibration['x'])} knots):")
+    print(f"  Test Brier (raw):        {brier_test:.4f}")
+    print(f"  Test Brier (calibrated): {brier_test_cal:.4f}")
+    
     # Feature importance
     print("="*60)
     print("FEATURE IMPORTANCE")
     print("="*60 + "\n")
     
     coefficients = model.coef_[0]
-    feature_importance = list(zip(FEATURES, coefficients))
+    feature_importance = list(zip(pipeline.columns, coefficients))
     feature_importance.sort(key=lambda x: abs(x[1]), reverse=True)
     
-    for feature, coef in feature_importance:
+    for feature, coef in feature_importance[:20]:
         direction = "[+] increases" if coef > 0 else "[-] decreases"
         print(f"  {feature:15s}: {coef:+.3f}  {direction} recovery")
     
@@ -200,15 +263,20 @@ def train_model():
     model_data = {
         "version": "1.0",
         "trained_on": "2024-01-10",
-        "n_samples": len(X),
+        "n_samples": len(y),
         "test_accuracy": float(test_acc),
         "test_auc": float(test_auc),
+        "test_brier": float(brier_test_cal),
         "bias": float(model.intercept_[0]),
+        "feature_spec": pipeline.spec,
         "weights": {
             feature: float(weight)
-            for feature, weight in zip(FEATURES, model.coef_[0])
+            for feature, weight in zip(pipeline.columns, model.coef_[0])
         },
+        "calibration": calibration,
         "reason_mappings": {
+            # Generic text for spec entries without a hand-written mapping
+            **default_reason_mappings(pipeline.spec),
             "ageing": [
                 "Low ageing increases recovery",
                 "Medium ageing moderately affects recovery",
@@ -246,10 +314,11 @@ def train_model():
         json.dump(model_data, f, indent=2)
     
     print("[OK] Model saved to model.json")
-    print(f"  - Weights: {len(FEATURES)} features")
+    print(f"  - Weights: {len(pipeline)} features")
     print(f"  - Bias: {model.intercept_[0]:.3f}")
     print(f"  - Test Accuracy: {test_acc:.1%}")
     print(f"  - Test AUC: {test_auc:.3f}")
+    print(f"  - Calibration: {calibration['method']} ({len(calibration['x'])} knots)")
     
     print("\n" + "="*60)
     print("Training Complete! SUCCESS!")
@@ -258,8 +327,17 @@ def train_model():
     print("Simply deploy the updated model.json to production.\n")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the DCA recovery model')
+    parser.add_argument('--dataset', default=None,
+                        help='directory written by build_dataset.py (default: synthetic data)')
+    parser.add_argument('--spec', default=None,
+                        help='feature spec JSON, or a model.json to take its spec from, '
+                             'for synthetic training (default: six base features)')
+    parser.add_argument('--calibration', default='isotonic', choices=CALIBRATION_METHODS,
+                        help='probability calibration fitted on the held-out split')
+    args = parser.parse_args()
     try:
-        train_model()
+        train_model(dataset=args.dataset, spec_path=args.spec, calibration_method=args.calibration)
     except Exception as e:
         print(f"\n[ERROR] Error during training: {e}")
         import traceback
@@ -5,14 +5,6 @@ import { createClient } from 'https://esm.sh/@supabase/supabase-js@2.39.3';
 import { corsHeaders } from '../_shared/cors.ts';
 import model from '../../../ml/model.json' assert { type: 'json' };
 
-interface CaseData {
-  id: string;
-  amount: number;
-  ageing_days: number;
-  status: string;
-  assigned_dca_id: string | null;
-}
-
 interface ActivityStats {
   attempts_count: number;
   days_since_last_update: number;
@@ -20,6 +12,44 @@ interface ActivityStats {
   ptp_active: boolean;
 }
 
+// Declarative feature spec (see ml/features.py for the format). Models
+// trained before feature_spec existed use the six original features.
+interface FeatureSpecEntry {
+  name: string;
+  type: 'numeric' | 'flag' | 'one_hot' | 'hashed';
+  source?: string;
+  sources?: string[];
+  equals?: Record<string, unknown>;
+  default?: number;
+  steps?: [string, ...number[]][];
+  categories?: unknown[];
+  buckets?: number;
+}
+
+const DEFAULT_FEATURE_SPEC: FeatureSpecEntry[] = [
+  { name: 'ageing', type: 'numeric', source: 'ageing_days', steps: [['divide', 120], ['min', 1]] },
+  { name: 'log_amount', type: 'numeric', source: 'amount', steps: [['log1p'], ['divide', 10]] },
+  { name: 'attempts', type: 'numeric', source: 'attempts_count', steps: [['divide', 10], ['min', 1]] },
+  { name: 'staleness', type: 'numeric', source: 'days_since_last_update', default: 999, steps: [['divide', 14], ['min', 1]] },
+  { name: 'dispute', type: 'flag', sources: ['has_dispute'], equals: { status: 'DISPUTE' } },
+  { name: 'ptp_active', type: 'flag', sources: ['ptp_active'] },
+];
+
+const featureSpec: FeatureSpecEntry[] = (model as any).feature_spec ?? DEFAULT_FEATURE_SPEC;
+const isSparseSpec = featureSpec.some((e) => e.type === 'one_hot' || e.type === 'hashed');
+
+// Case columns the spec reads on top of the ones score_case always needs
+const CASE_COLUMNS = ['id', 'amount', 'ageing_days', 'status', 'assigned_dca_id'];
+const ACTIVITY_FIELDS = ['attempts_count', 'days_since_last_update', 'has_dispute', 'ptp_active'];
+const caseSelect = [
+  ...new Set([
+    ...CASE_COLUMNS,
+    ...featureSpec
+      .flatMap((e) => [e.source, ...(e.sources ?? []), ...Object.keys(e.equals ?? {})])
+      .filter((k): k is string => !!k && !ACTIVITY_FIELDS.includes(k)),
+  ]),
+].join(', ');
+
 Deno.serve(async (req) => {
   // Handle CORS preflight
   if (req.method === 'OPTIONS') {
@@ -50,7 +80,7 @@ Deno.serve(async (req) => {
     // Fetch case data
     const { data: caseData, error: caseError } = await supabaseClient
       .from('cases')
-      .select('id, amount, ageing_days, status, assigned_dca_id')
+      .select(caseSelect)
       .eq('id', case_id)
       .single();
 
@@ -64,30 +94,21 @@ Deno.serve(async (req) => {
     // Fetch activity stats
     const stats = await computeActivityStats(supabaseClient, case_id);
 
-    // Compute features
-    const features = computeFeatures(caseData, stats);
+    // Compute features (column -> value; inactive categorical columns are omitted)
+    const features = computeFeatures({ ...caseData, ...stats }, featureSpec);
 
     // Compute linear combination (z-score)
-    const contributions = {
-      bias: model.bias,
-      ageing: model.weights.ageing * features.ageing,
-      log_amount: model.weights.log_amount * features.log_amount,
-      attempts: model.weights.attempts * features.attempts,
-      staleness: model.weights.staleness * features.staleness,
-      dispute: model.weights.dispute * features.dispute,
-      ptp_active: model.weights.ptp_active * features.ptp_active
-    };
-
-    const z = model.bias +
-      contributions.ageing +
-      contributions.log_amount +
-      contributions.attempts +
-      contributions.staleness +
-      contributions.dispute +
-      contributions.ptp_active;
+    const weights: Record<string, number> = model.weights;
+    const contributions: Record<string, number> = { bias: model.bias };
+    let z = model.bias;
+    for (const [column, value] of Object.entries(features)) {
+      contributions[column] = (weights[column] ?? 0) * value;
+      z += contributions[column];
+    }
 
-    // Apply sigmoid activation
-    const recovery_prob = sigmoid(z);
+    // Apply sigmoid activation, then the calibration lookup table (if present)
+    const raw_prob = sigmoid(z);
+    const recovery_prob = applyCalibration(raw_prob, (model as any).calibration);
 
     const priority_score = computePriorityScore(
       caseData.amount,
@@ -96,7 +117,7 @@ Deno.serve(async (req) => {
       stats.days_since_last_update
     );
 
-    const reason_codes = computeReasonCodes(features, model);
+    const reason_codes = computeReasonCodes(features, contributions, model);
 
     // Build detailed explanation
     const calculation_details = {
@@ -111,8 +132,12 @@ Deno.serve(async (req) => {
         contributions: contributions,
         z_score: z,
         recovery_prob_before_sigmoid: z,
-        recovery_prob_after_sigmoid: recovery_prob,
-        formula: `sigmoid(${model.bias} + ${contributions.ageing.toFixed(3)} + ${contributions.log_amount.toFixed(3)} + ${contributions.attempts.toFixed(3)} + ${contributions.staleness.toFixed(3)} + ${contributions.dispute.toFixed(3)} + ${contributions.ptp_active.toFixed(3)})`
+        recovery_prob_after_sigmoid: raw_prob,
+        recovery_prob_calibrated: recovery_prob,
+        formula: `sigmoid(${[
+          String(model.bias),
+          ...Object.keys(features).map((c) => contributions[c].toFixed(3)),
+        ].join(' + ')})`
       },
       priority_calculation: {
         formula: `${caseData.amount} * ${recovery_prob.toFixed(4)} - 0.3 * ${caseData.ageing_days} - 0.2 * ${stats.days_since_last_update}`,
@@ -146,6 +171,9 @@ Deno.serve(async (req) => {
         recovery_prob_30d: recovery_prob,
         priority_score: priority_score,
         reason_codes: reason_codes,
+        // Snapshot of model inputs, used to learn from the case once it closes
+        features: features,
+        model_version: (model as any).version ?? null,
       },
     });
 
@@ -217,24 +245,104 @@ async function computeActivityStats(supabase: any, caseId: string): Promise<Acti
   };
 }
 
-function computeFeatures(caseData: CaseData, stats: ActivityStats) {
-  // Dispute flag: active if status is DISPUTE OR has dispute activity
-  const hasDispute = caseData.status === 'DISPUTE' || stats.has_dispute;
-  
-  return {
-    ageing: Math.min(caseData.ageing_days / 120, 1), // normalized [0,1], max 120 days
-    log_amount: Math.log(1 + caseData.amount) / 10, // ln(amount+1)/10 for scale
-    attempts: Math.min(stats.attempts_count / 10, 1), // normalized [0,1], max 10 attempts
-    staleness: Math.min(stats.days_since_last_update / 14, 1), // normalized [0,1], max 14 days
-    dispute: hasDispute ? 1 : 0,
-    ptp_active: stats.ptp_active ? 1 : 0,
-  };
+function applyStep(x: number, [op, ...args]: [string, ...number[]]): number {
+  switch (op) {
+    case 'divide': return x / args[0];
+    case 'multiply': return x * args[0];
+    case 'add': return x + args[0];
+    case 'log1p': return Math.log1p(x);
+    case 'min': return Math.min(x, args[0]);
+    case 'max': return Math.max(x, args[0]);
+    case 'clip': return Math.min(Math.max(x, args[0]), args[1]);
+    default: throw new Error(`Unknown step '${op}'`);
+  }
+}
+
+function categoryKey(value: unknown): string {
+  // Text a categorical value is matched and hashed by; category_key() in
+  // ml/features.py writes booleans and whole floats the same way
+  return String(value);
+}
+
+function fnv1a32(value: string): number {
+  // 32-bit FNV-1a over UTF-8 bytes, same as fnv1a_32() in ml/features.py
+  let h = 0x811c9dc5;
+  for (const byte of new TextEncoder().encode(value)) {
+    h = Math.imul(h ^ byte, 0x01000193) >>> 0;
+  }
+  return h;
+}
+
+function computeFeatures(record: Record<string, any>, spec: FeatureSpecEntry[]): Record<string, number> {
+  // Mirrors FeaturePipeline.transform() in ml/features.py for a single case
+  const features: Record<string, number> = {};
+  for (const entry of spec) {
+    switch (entry.type) {
+      case 'numeric': {
+        let x = Number(record[entry.source!] ?? entry.default ?? 0);
+        for (const step of entry.steps ?? []) x = applyStep(x, step);
+        features[entry.name] = x;
+        break;
+      }
+      case 'flag': {
+        const on = (entry.sources ?? []).some((k) => !!record[k]) ||
+          Object.entries(entry.equals ?? {}).some(([k, v]) => record[k] === v);
+        features[entry.name] = on ? 1 : 0;
+        break;
+      }
+      case 'one_hot': {
+        const value = record[entry.source!];
+        if (value != null) {
+          const key = categoryKey(value);
+          if (entry.categories!.some((c) => categoryKey(c) === key)) {
+            features[`${entry.name}=${key}`] = 1;
+          }
+        }
+        break;
+      }
+      case 'hashed': {
+        const value = record[entry.source!];
+        if (value != null) {
+          features[`${entry.name}#${fnv1a32(categoryKey(value)) % entry.buckets!}`] = 1;
+        }
+        break;
+      }
+      default:
+        throw new Error(`Unknown feature type '${(entry as any).type}' for '${entry.name}'`);
+    }
+  }
+  return features;
 }
 
 function sigmoid(x: number): number {
   return 1 / (1 + Math.exp(-x));
 }
 
+interface Calibration {
+  method: string;
+  x: number[];
+  y: number[];
+}
+
+function applyCalibration(prob: number, calibration?: Calibration): number {
+  // Piecewise-linear lookup (same semantics as np.interp): clamp at the ends,
+  // binary-search the knot interval, interpolate linearly within it.
+  if (!calibration || calibration.x.length === 0) return prob;
+  const { x, y } = calibration;
+  if (prob <= x[0]) return y[0];
+  if (prob >= x[x.length - 1]) return y[y.length - 1];
+
+  let lo = 0;
+  let hi = x.length - 1;
+  while (hi - lo > 1) {
+    const mid = (lo + hi) >> 1;
+    if (x[mid] <= prob) lo = mid;
+    else hi = mid;
+  }
+  const t = (prob - x[lo]) / (x[hi] - x[lo]);
+  return y[lo] + t * (y[hi] - y[lo]);
+}
+
 function computePriorityScore(
   amount: number,
   recoveryProb: number,
@@ -245,18 +353,40 @@ function computePriorityScore(
   return amount * recoveryProb - 0.3 * ageingDays - 0.2 * daysSinceUpdate;
 }
 
-function computeReasonCodes(features: any, model: any): string[] {
-  // Compute contributions
-  const contributions = [
-    { name: 'ageing', value: Math.abs(model.weights.ageing * features.ageing), desc: model.reason_mappings.ageing },
-    { name: 'log_amount', value: Math.abs(model.weights.log_amount * features.log_amount), desc: model.reason_mappings.log_amount },
-    { name: 'attempts', value: Math.abs(model.weights.attempts * features.attempts), desc: model.reason_mappings.attempts },
-    { name: 'staleness', value: Math.abs(model.weights.staleness * features.staleness), desc: model.reason_mappings.staleness },
-    { name: 'dispute', value: Math.abs(model.weights.dispute * features.dispute), desc: model.reason_mappings.dispute },
-    { name: 'ptp_active', value: Math.abs(model.weights.ptp_active * features.ptp_active), desc: model.reason_mappings.ptp_active },
-  ];
-
-  // Sort by contribution and take top 3
-  contributions.sort((a, b) => b.value - a.value);
-  return contributions.slice(0, 3).map((c) => c.desc);
+function reasonText(mapping: string | string[], binary: boolean, value: number): string {
+  // reason_mappings are either a single string or [low, medium, high]
+  if (typeof mapping === 'string') return mapping;
+  if (binary) return mapping[value === 1 ? 2 : 0];
+  return mapping[value < 0.33 ? 0 : value < 0.67 ? 1 : 2];
+}
+
+function computeReasonCodes(
+  features: Record<string, number>,
+  contributions: Record<string, number>,
+  model: any
+): string[] {
+  const mappings = model.reason_mappings ?? {};
+  const owners = new Map<string, FeatureSpecEntry>();
+  for (const entry of featureSpec) {
+    for (const column of Object.keys(features)) {
+      if (column === entry.name || column.startsWith(`${entry.name}=`) || column.startsWith(`${entry.name}#`)) {
+        owners.set(column, entry);
+      }
+    }
+  }
+
+  const mappingFor = (column: string) =>
+    mappings[column] ?? mappings[owners.get(column)?.name ?? column];
+
+  // Unmapped columns are skipped so raw column names never reach users.
+  // Sparse specs (like the batch scorer's CSR path) rank only non-zero columns.
+  const ranked = Object.keys(features)
+    .filter((column) => mappingFor(column) !== undefined)
+    .filter((column) => !isSparseSpec || contributions[column] !== 0)
+    .sort((a, b) => Math.abs(contributions[b]) - Math.abs(contributions[a]));
+
+  // Take top 3
+  return ranked.slice(0, 3).map((column) =>
+    reasonText(mappingFor(column), owners.get(column)?.type !== 'numeric', features[column])
+  );
 }